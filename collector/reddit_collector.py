@@ -6,45 +6,162 @@ Fetches posts using public JSON endpoints (no API key needed!)
 
 import requests
 import time
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 import sys
 import os
 from dotenv import load_dotenv
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database.mongo_connector import save_posts
+from database.mongo_connector import retention_cutoff, save_posts
+from database.search_index import update_search_index
 
 # Load environment variables
 load_dotenv()
 
 # Configuration
 USER_AGENT = "trendradar/1.0 (educational project)"
-REQUEST_DELAY = 2  # Delay between requests to be polite to Reddit's servers
+REDDIT_BASE_URL = os.getenv("REDDIT_BASE_URL", "https://www.reddit.com").rstrip("/")
+# Delay between requests to be polite to Reddit's servers
+REQUEST_DELAY = float(os.getenv("REDDIT_REQUEST_DELAY", "2"))
+MAX_RETRIES = 3  # Retries for 429 and 5xx responses
+# Pages to follow per listing via the 'after' cursor
+PAGES_PER_LISTING = int(os.getenv("COLLECTOR_PAGES", "1"))
 
-def fetch_subreddit_posts(subreddit, sort="new", limit=100):
+# Listings to pull and the minimum minutes between pulls, as "sort:minutes,..."
+DEFAULT_LISTINGS = "new:0,rising:60,hot:180"
+LISTING_SORTS = ("hot", "new", "top", "rising")
+
+def parse_listing_schedule(value):
+    """
+    Parse a "sort:minutes,..." listing schedule
+    
+    Returns:
+        dict: Sort order -> minimum interval, or None if the value is malformed
+    """
+    schedule = {}
+    for item in value.split(","):
+        sort, _, minutes = item.strip().partition(":")
+        if sort not in LISTING_SORTS or not minutes.strip().isdigit():
+            return None
+        schedule[sort] = timedelta(minutes=int(minutes))
+    return schedule
+
+LISTING_SCHEDULE = parse_listing_schedule(os.getenv("COLLECTOR_LISTINGS", DEFAULT_LISTINGS))
+if LISTING_SCHEDULE is None:
+    print(f"⚠️ Invalid COLLECTOR_LISTINGS {os.getenv('COLLECTOR_LISTINGS')!r}, using {DEFAULT_LISTINGS}")
+    LISTING_SCHEDULE = parse_listing_schedule(DEFAULT_LISTINGS)
+SCHEDULE_SLACK = timedelta(minutes=5)  # Hourly runs drift by a few seconds
+
+# When each listing was last pulled
+last_fetched = {}
+
+# Reuse connections across requests
+session = requests.Session()
+session.headers['User-Agent'] = USER_AGENT
+
+# Last ETag seen per listing URL, sent back as If-None-Match
+etags = {}
+
+def header_seconds(value):
+    """
+    Parse a delay header given as seconds or as an HTTP-date
+    
+    Returns:
+        float: Seconds to wait, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0)
+
+def retry_delay(response, attempt):
+    """Seconds to wait before retrying a 429 or 5xx response"""
+    wait = header_seconds(response.headers.get('Retry-After'))
+    if wait is None and response.status_code == 429:
+        # Only a 429 means the rate-limit window itself has to pass
+        wait = header_seconds(response.headers.get('x-ratelimit-reset'))
+    return wait if wait is not None else 2 ** attempt
+
+def get_listing(url):
+    """
+    GET a listing, honouring ETags, rate limits and transient errors
+    
+    Args:
+        url (str): Listing URL
+    
+    Returns:
+        dict: Parsed JSON, or None if the listing is unchanged (304)
+    """
+    headers = {}
+    if url in etags:
+        headers['If-None-Match'] = etags[url]
+    
+    for attempt in range(MAX_RETRIES + 1):
+        response = session.get(url, headers=headers, timeout=30)
+        retryable = response.status_code == 429 or response.status_code >= 500
+        if not retryable or attempt == MAX_RETRIES:
+            break
+        time.sleep(retry_delay(response, attempt))
+    
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    
+    if response.headers.get('ETag'):
+        etags[url] = response.headers['ETag']
+    
+    # Out of quota: wait for the window to reset instead of hitting a 429
+    try:
+        remaining = float(response.headers.get('x-ratelimit-remaining'))
+    except (TypeError, ValueError):
+        remaining = None
+    if remaining is not None and remaining < 1:
+        time.sleep(header_seconds(response.headers.get('x-ratelimit-reset')) or 0)
+    
+    return response.json()
+
+def fetch_subreddit_posts(subreddit, sort="new", limit=100, pages=1):
     """
     Fetch posts from a subreddit using JSON endpoint
     
     Args:
         subreddit (str): Name of subreddit (without r/)
         sort (str): 'hot', 'new', 'top', or 'rising'
-        limit (int): Number of posts to fetch (max 100)
+        limit (int): Number of posts to fetch per page (max 100)
+        pages (int): Number of pages to follow via the 'after' cursor
     
     Returns:
-        list: List of post dictionaries
+        list: List of post dictionaries, or None if the listing could not be fetched
     """
-    url = f"https://www.reddit.com/r/{subreddit}/{sort}.json?limit={limit}"
-    headers = {'User-Agent': USER_AGENT}
+    base_url = f"{REDDIT_BASE_URL}/r/{subreddit}/{sort}.json?limit={limit}"
     
     try:
         print(f"Fetching from r/{subreddit}...")
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
+        children = []
+        after = None
+        for _ in range(pages):
+            url = f"{base_url}&after={after}" if after else base_url
+            data = get_listing(url)
+            if data is None:
+                break
+            children.extend(data['data']['children'])
+            after = data['data'].get('after')
+            if not after:
+                break
         
         posts = []
-        for post in data['data']['children']:
+        for post in children:
             p = post['data']
             
             # Combine title and text for analysis
@@ -73,10 +190,10 @@ def fetch_subreddit_posts(subreddit, sort="new", limit=100):
     
     except requests.exceptions.RequestException as e:
         print(f"  ✗ Error fetching from r/{subreddit}: {e}")
-        return []
+        return None
     except KeyError as e:
         print(f"  ✗ Error parsing data from r/{subreddit}: {e}")
-        return []
+        return None
 
 def fetch_multiple_subreddits(subreddits, sort="new", posts_per_subreddit=50):
     """
@@ -90,41 +207,86 @@ def fetch_multiple_subreddits(subreddits, sort="new", posts_per_subreddit=50):
     Returns:
         list: Combined list of all posts
     """
-    all_posts = []
+    posts, _ = fetch_listings(subreddits, [sort], posts_per_subreddit)
+    return posts
+
+def fetch_listings(subreddits, listings, posts_per_subreddit=50, pages=PAGES_PER_LISTING):
+    """
+    Fetch several listings from multiple subreddits, deduplicated by post id
+    
+    Args:
+        subreddits (list): List of subreddit names
+        listings (list): Sort orders to fetch for each subreddit
+        posts_per_subreddit (int): Posts to fetch from each listing page
+        pages (int): Pages to follow per listing
+    
+    Returns:
+        tuple: (unique posts across all listings,
+                set of listings fetched successfully for at least one subreddit)
+    """
+    unique_posts = {}
+    succeeded = set()
+    fetched = 0
     
     for subreddit in subreddits:
-        posts = fetch_subreddit_posts(subreddit, sort, posts_per_subreddit)
-        all_posts.extend(posts)
-        time.sleep(REQUEST_DELAY)
+        for sort in listings:
+            posts = fetch_subreddit_posts(subreddit, sort, posts_per_subreddit, pages)
+            if posts is None:
+                time.sleep(REQUEST_DELAY)
+                continue
+            succeeded.add(sort)
+            fetched += len(posts)
+            # The same post often shows up in several listings; keep the latest copy
+            for post in posts:
+                unique_posts[post['id']] = post
+            time.sleep(REQUEST_DELAY)
     
-    print(f"\nTotal posts collected: {len(all_posts)}")
-    return all_posts
+    print(f"\nTotal posts collected: {len(unique_posts)} unique ({fetched} across {', '.join(listings)})")
+    return list(unique_posts.values()), succeeded
 
-def job():
+def due_listings(now=None):
+    """Listings whose LISTING_SCHEDULE interval has passed since their last pull"""
+    now = now or datetime.utcnow()
+    return [
+        sort for sort, interval in LISTING_SCHEDULE.items()
+        if sort not in last_fetched or now - last_fetched[sort] >= interval - SCHEDULE_SLACK
+    ]
+
+# Subreddits to monitor
+SUBREDDITS = [
+    "technology",
+    "artificial",
+    "MachineLearning",
+    "dataisbeautiful",
+    "python",
+    "programming",
+    "Futureology",
+    "singularity"
+]
+
+def job(subreddits=None):
     """Main job function to be called by scheduler"""
     print(f"\n{'='*50}")
-    print(f"Running collection at {datetime.utcnow()} UTC")
+    started = datetime.utcnow()
+    print(f"Running collection at {started} UTC")
     print('='*50)
     
-    # Subreddits to monitor
-    subreddits = [
-        "technology",
-        "artificial",
-        "MachineLearning",
-        "dataisbeautiful",
-        "python",
-        "programming",
-        "Futureology",
-        "singularity"
-    ]
-    
-    posts = fetch_multiple_subreddits(subreddits, sort="new", posts_per_subreddit=25)
+    listings = due_listings(started)
+    posts, succeeded = fetch_listings(subreddits or SUBREDDITS, listings, posts_per_subreddit=25)
+    # A listing that failed everywhere (e.g. during an outage) stays due for the next run
+    for sort in succeeded:
+        last_fetched[sort] = started
     
     if posts:
         saved_count = save_posts(posts)
         print(f"\n✅ Saved {saved_count} posts to MongoDB")
+        # Posts past the retention cutoff were not stored, so they are not indexed either
+        indexed_count = update_search_index(posts, retention_cutoff())
+        print(f"✅ Indexed {indexed_count} new posts for search")
+        return saved_count
     else:
         print("\n⚠️ No posts collected")
+        return 0
 
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--once":
@@ -132,12 +294,16 @@ if __name__ == "__main__":
         job()
     else:
         import schedule
+        from database.retention import run_retention
+        from database.clustering import run_clustering
         
         print("Starting Reddit JSON Collector (runs every hour)...")
         print("Press Ctrl+C to stop")
         
         job()
         schedule.every().hour.do(job)
+        schedule.every().day.do(run_retention)
+        schedule.every().hour.do(run_clustering)
         
         try:
             while True:
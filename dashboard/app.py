@@ -8,7 +8,20 @@ import os
 import numpy as np
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database.mongo_connector import get_posts, get_topic_mentions
+from database.mongo_connector import (
+    get_posts, get_topic_mentions, get_trending, get_hourly_rollups, get_cluster_counts
+)
+from database.trending import engagement_score
+from database.parquet_archive import read_posts as read_archived_posts
+from database.search_index import INDEX_PATH, SearchIndex
+from database.sketches import empty_hll, hll_add, hll_count, hll_merge
+from database.topics import TOPICS, topic_regex
+
+# Columns the dashboard needs when reading from the Parquet archive
+ARCHIVE_COLUMNS = [
+    'title', 'full_text', 'subreddit', 'author', 'created_utc',
+    'score', 'num_comments', 'url', 'trending_rank'
+]
 
 # ============================================================================
 # PROFESSIONAL COLOR SYSTEM - HEX CODES
@@ -36,6 +49,11 @@ COLORS = {
     'chart_6': '#4ADE80',
 }
 
+@st.cache_resource(max_entries=1)
+def load_search_index(mtime):
+    """Load the on-disk search index; `mtime` busts the cache when the collector rewrites it"""
+    return SearchIndex.load()
+
 # ============================================================================
 # PAGE CONFIG
 # ============================================================================
@@ -218,29 +236,40 @@ with st.sidebar:
     
     st.markdown("<hr>", unsafe_allow_html=True)
     
-    st.markdown("<p style='color: #94A3B8; font-size: 0.75rem; text-transform: uppercase;'>Time Window</p>", unsafe_allow_html=True)
-    time_range = st.selectbox(
+    st.markdown("<p style='color: #94A3B8; font-size: 0.75rem; text-transform: uppercase;'>Data Source</p>", unsafe_allow_html=True)
+    data_source = st.selectbox(
         "",
-        ["Last 24 Hours", "Last 7 Days", "Last 30 Days", "Last 90 Days"],
-        index=1,
+        ["Live (MongoDB)", "Archive (Parquet)"],
+        index=0,
         label_visibility="collapsed"
     )
+    archive_mode = data_source == "Archive (Parquet)"
     
+    st.markdown("<br>", unsafe_allow_html=True)
+    
+    st.markdown("<p style='color: #94A3B8; font-size: 0.75rem; text-transform: uppercase;'>Time Window</p>", unsafe_allow_html=True)
     days_map = {
         "Last 24 Hours": 1,
         "Last 7 Days": 7,
         "Last 30 Days": 30,
         "Last 90 Days": 90
     }
+    if archive_mode:
+        days_map["Last 365 Days"] = 365
+    
+    time_range = st.selectbox(
+        "",
+        list(days_map),
+        index=1,
+        label_visibility="collapsed"
+    )
+    
     days = days_map[time_range]
     
     st.markdown("<br>", unsafe_allow_html=True)
     
     st.markdown("<p style='color: #94A3B8; font-size: 0.75rem; text-transform: uppercase;'>Topics</p>", unsafe_allow_html=True)
-    all_topics = [
-        "AI", "Machine Learning", "Deep Learning", "ChatGPT",
-        "Neural Networks", "Robotics", "Data Science", "Python"
-    ]
+    all_topics = TOPICS
     
     selected_topics = st.multiselect(
         "",
@@ -292,19 +321,57 @@ st.markdown("""
 try:
     end = datetime.utcnow()
     start = end - timedelta(days=days)
-    all_posts = get_posts(start, end)
     
-    if all_posts:
-        df = pd.DataFrame(all_posts)
+    search_query = st.text_input(
+        "",
+        placeholder="🔎 Search posts in the selected window and subreddits...",
+        label_visibility="collapsed"
+    )
+    
+    if search_query:
+        mtime = os.path.getmtime(INDEX_PATH) if os.path.exists(INDEX_PATH) else 0
+        results = load_search_index(mtime).search(search_query, start, end, selected_subreddits, k=20)
         
+        st.markdown(f"<div class='section-header'>🔎 Search Results ({len(results)})</div>", unsafe_allow_html=True)
+        if not results:
+            st.info("No matching posts. If the index is empty, run `python database/search_index.py --rebuild`.")
+        
+        for post in results:
+            hours_ago = int((datetime.utcnow() - post['created_utc']).total_seconds() / 3600)
+            st.markdown(f"""
+            <div class='post-card'>
+                <div class='post-title'>{post['title'][:150]}</div>
+                <div class='post-meta'>
+                    <span class='post-badge'>📌 r/{post['subreddit']}</span>
+                    <span class='post-badge'>🎯 {post['relevance']:.2f}</span>
+                    <span class='post-badge'>⏱️ {hours_ago}h ago</span>
+                </div>
+                <a href='{post['url']}' target='_blank' class='post-link'>View discussion →</a>
+            </div>
+            """, unsafe_allow_html=True)
+    
+    if archive_mode:
+        df = read_archived_posts(start, end, selected_subreddits, columns=ARCHIVE_COLUMNS)
+    else:
+        df = pd.DataFrame(get_posts(start, end))
+    
+    if len(df) > 0:
         if selected_subreddits:
             df = df[df['subreddit'].isin(selected_subreddits)]
         
         if len(df) > 0:
+            # Compacted posts have lost their text; their mentions and authors live in the hourly rollups
+            rollup_df = pd.DataFrame([] if archive_mode else get_hourly_rollups(start, end, selected_subreddits))
+            has_rollups = len(rollup_df) > 0
+            if has_rollups:
+                rollup_df['date'] = pd.to_datetime(rollup_df['hour']).dt.date
+            # Compacted posts are counted by the rollups until the TTL purge; count them only once
+            raw_df = df[df['compacted_at'].isna()] if 'compacted_at' in df.columns else df
+            total_posts = len(raw_df) + (int(rollup_df['post_count'].sum()) if has_rollups else 0)
+            
             kpi_cols = st.columns(4)
             
             with kpi_cols[0]:
-                total_posts = len(df)
                 posts_24h = len(df[df['created_utc'] > datetime.utcnow() - timedelta(days=1)])
                 st.markdown(f"""
                 <div class='kpi-card'>
@@ -315,19 +382,26 @@ try:
                 """, unsafe_allow_html=True)
             
             with kpi_cols[1]:
-                avg_engagement = (df['score'] + df['num_comments'] * 2).mean()
-                max_engagement = (df['score'] + df['num_comments'] * 2).max()
+                engagement = engagement_score(raw_df['score'], raw_df['num_comments'])
+                total_engagement = engagement.sum()
+                if has_rollups:
+                    total_engagement += engagement_score(rollup_df['score_sum'].sum(), rollup_df['comments_sum'].sum())
+                    engagement = pd.concat([engagement, rollup_df['engagement_max']])
+                avg_engagement = total_engagement / max(total_posts, 1)
+                max_engagement = engagement.max()
                 st.markdown(f"""
                 <div class='kpi-card'>
                     <div class='kpi-label'>Avg Engagement</div>
                     <div class='kpi-value'>{avg_engagement:.0f}</div>
-                    <div class='kpi-delta'>Peak: {max_engagement:,}</div>
+                    <div class='kpi-delta'>Peak: {max_engagement:,.0f}</div>
                 </div>
                 """, unsafe_allow_html=True)
             
             with kpi_cols[2]:
-                total_comments = df['num_comments'].sum()
-                avg_comments = df['num_comments'].mean()
+                total_comments = int(raw_df['num_comments'].sum())
+                if has_rollups:
+                    total_comments += int(rollup_df['comments_sum'].sum())
+                avg_comments = total_comments / max(total_posts, 1)
                 st.markdown(f"""
                 <div class='kpi-card'>
                     <div class='kpi-label'>Total Comments</div>
@@ -337,8 +411,17 @@ try:
                 """, unsafe_allow_html=True)
             
             with kpi_cols[3]:
-                unique_authors = df['author'].nunique()
+                if has_rollups:
+                    # Union of raw authors and the rollup sketches, so compacted hours still count
+                    authors_hll = hll_add(empty_hll(), df['author'].dropna())
+                    for sketch in rollup_df['authors_hll'].dropna():
+                        authors_hll = hll_merge(authors_hll, bytes(sketch))
+                    unique_authors = hll_count(authors_hll)
+                else:
+                    unique_authors = df['author'].nunique()
                 active_subs = df['subreddit'].nunique()
+                if has_rollups:
+                    active_subs = len(set(df['subreddit']) | set(rollup_df['subreddit']))
                 st.markdown(f"""
                 <div class='kpi-card'>
                     <div class='kpi-label'>Active Communities</div>
@@ -355,15 +438,17 @@ try:
                                COLORS['chart_4'], COLORS['chart_5'], COLORS['chart_6']]
                 
                 for idx, topic in enumerate(selected_topics[:6]):
-                    topic_posts = df[df['full_text'].str.contains(topic, case=False, na=False)]
-                    if len(topic_posts) > 0:
-                        topic_df = topic_posts.copy()
-                        topic_df['date'] = pd.to_datetime(topic_df['created_utc']).dt.date
-                        daily = topic_df.groupby('date').size().reset_index(name='count')
-                        
+                    topic_posts = df[df['full_text'].str.contains(topic_regex(topic), case=False, na=False)]
+                    daily = topic_posts.groupby(pd.to_datetime(topic_posts['created_utc']).dt.date).size()
+                    if has_rollups:
+                        rolled_up = rollup_df['topic_counts'].apply(lambda counts: counts.get(topic, 0))
+                        daily = daily.add(rolled_up.groupby(rollup_df['date']).sum(), fill_value=0)
+                    daily = daily[daily > 0].sort_index()
+                    
+                    if len(daily) > 0:
                         fig.add_trace(go.Scatter(
-                            x=daily['date'],
-                            y=daily['count'],
+                            x=daily.index,
+                            y=daily.values,
                             mode='lines+markers',
                             name=topic,
                             line=dict(width=2.5, color=chart_colors[idx % len(chart_colors)]),
@@ -411,10 +496,12 @@ try:
             with col1:
                 st.markdown("<div class='section-header'>🔥 Trending Now</div>", unsafe_allow_html=True)
                 
-                df['trending_score'] = df['score'] + (df['num_comments'] * 3)
-                trending = df.nlargest(15, 'trending_score')
+                if archive_mode:
+                    trending = df.nlargest(15, 'trending_rank').to_dict('records')
+                else:
+                    trending = get_trending(timedelta(days=days), selected_subreddits, k=15)
                 
-                for _, post in trending.iterrows():
+                for post in trending:
                     time_ago = datetime.utcnow() - pd.to_datetime(post['created_utc'])
                     hours_ago = int(time_ago.total_seconds() / 3600)
                     
@@ -434,7 +521,10 @@ try:
             with col2:
                 st.markdown("<div class='section-header'>📊 Subreddit Activity</div>", unsafe_allow_html=True)
                 
-                sub_counts = df['subreddit'].value_counts().head(8)
+                sub_counts = raw_df['subreddit'].value_counts()
+                if has_rollups:
+                    sub_counts = sub_counts.add(rollup_df.groupby('subreddit')['post_count'].sum(), fill_value=0)
+                sub_counts = sub_counts.astype(int).sort_values(ascending=False).head(8)
                 fig2 = go.Figure(data=[
                     go.Bar(
                         y=sub_counts.index,
@@ -474,13 +564,15 @@ try:
                 
                 topic_counts = {}
                 for topic in all_topics[:6]:
-                    count = df['full_text'].str.contains(topic, case=False, na=False).sum()
+                    count = df['full_text'].str.contains(topic_regex(topic), case=False, na=False).sum()
+                    if has_rollups:
+                        count += rollup_df['topic_counts'].apply(lambda counts: counts.get(topic, 0)).sum()
                     if count > 0:
                         topic_counts[topic] = count
                 
                 if topic_counts:
                     for topic, count in sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)[:5]:
-                        percentage = (count / len(df)) * 100
+                        percentage = (count / max(total_posts, 1)) * 100
                         st.markdown(f"""
                         <div style='margin-bottom: 0.75rem;'>
                             <div style='display: flex; justify-content: space-between; margin-bottom: 0.25rem;'>
@@ -493,10 +585,66 @@ try:
                         </div>
                         """, unsafe_allow_html=True)
             
+            if not archive_mode:
+                st.markdown("<div class='section-header'>🧩 Emergent Clusters</div>", unsafe_allow_html=True)
+                
+                cluster_df = pd.DataFrame(get_cluster_counts(start, end, selected_subreddits))
+                if len(cluster_df) > 0:
+                    chart_colors = [COLORS['chart_1'], COLORS['chart_2'], COLORS['chart_3'], 
+                                   COLORS['chart_4'], COLORS['chart_5'], COLORS['chart_6']]
+                    top_clusters = cluster_df.groupby('cluster')['count'].sum().nlargest(6).index
+                    
+                    fig4 = go.Figure()
+                    for idx, cluster in enumerate(top_clusters):
+                        daily = cluster_df[cluster_df['cluster'] == cluster]
+                        fig4.add_trace(go.Scatter(
+                            x=daily['date'],
+                            y=daily['count'],
+                            mode='lines+markers',
+                            name=daily['label'].iloc[0] or f"Cluster {cluster}",
+                            line=dict(width=2.5, color=chart_colors[idx % len(chart_colors)]),
+                            marker=dict(size=6, color=chart_colors[idx % len(chart_colors)])
+                        ))
+                    
+                    fig4.update_layout(
+                        height=350,
+                        margin=dict(l=40, r=40, t=20, b=40),
+                        paper_bgcolor='rgba(0,0,0,0)',
+                        plot_bgcolor='rgba(0,0,0,0)',
+                        font=dict(family="Inter", size=11, color=COLORS['text_secondary']),
+                        legend=dict(
+                            bgcolor=COLORS['bg_card'],
+                            bordercolor=COLORS['border'],
+                            borderwidth=1,
+                            font=dict(color=COLORS['text_primary']),
+                            orientation="h",
+                            yanchor="bottom",
+                            y=1.02,
+                            xanchor="right",
+                            x=1
+                        ),
+                        xaxis=dict(
+                            gridcolor=COLORS['grid'],
+                            linecolor=COLORS['border'],
+                            tickfont=dict(color=COLORS['text_secondary'])
+                        ),
+                        yaxis=dict(
+                            gridcolor=COLORS['grid'],
+                            linecolor=COLORS['border'],
+                            tickfont=dict(color=COLORS['text_secondary'])
+                        )
+                    )
+                    st.plotly_chart(fig4, use_container_width=True)
+                else:
+                    st.info("No clusters yet. Run `python database/clustering.py` to group posts outside the tracked topics.")
+            
             st.markdown("<div class='section-header'>⏰ Activity Patterns</div>", unsafe_allow_html=True)
             
-            df['hour'] = pd.to_datetime(df['created_utc']).dt.hour
-            hourly = df.groupby('hour').size().reset_index(name='count')
+            hourly = raw_df.groupby(pd.to_datetime(raw_df['created_utc']).dt.hour).size()
+            if has_rollups:
+                rolled_up = rollup_df.groupby(pd.to_datetime(rollup_df['hour']).dt.hour)['post_count'].sum()
+                hourly = hourly.add(rolled_up, fill_value=0)
+            hourly = hourly.astype(int).rename_axis('hour').reset_index(name='count')
             
             fig3 = go.Figure()
             fig3.add_trace(go.Bar(
@@ -536,7 +684,10 @@ try:
         else:
             st.warning("No posts match your selected filters.")
     else:
-        st.warning("No data available. Please run the collector first.")
+        if archive_mode:
+            st.warning("No archived data. Run `python database/parquet_archive.py --backfill` first.")
+        else:
+            st.warning("No data available. Please run the collector first.")
 
 except Exception as e:
     st.error(f"Error loading dashboard: {str(e)}")
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Emergent topic clustering for TrendRadar
+
+Posts that match none of the tracked TOPICS are vectorized with hashed
+TF-IDF (no vocabulary, just HASH_DIM buckets and their document
+frequencies) and clustered with mini-batch spherical k-means, seeded
+with k-means++ once enough distinct posts exist. When a batch holds a
+group of posts that fit no center but are similar to each other, a
+starved or redundant center is given up for them under a new cluster id,
+so the old cluster keeps its id, posts and history. Each run only
+touches new posts, plus posts that fit no cluster for up to
+CLUSTER_RETRIES runs, so its cost grows with the number of new posts,
+not with history.
+
+Model state lives on disk; cluster labels and per-hour counts are stored
+in MongoDB for the dashboard.
+"""
+
+import os
+import sys
+import zlib
+import pickle
+from datetime import datetime, timedelta
+import numpy as np
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.search_index import tokenize
+from database.topics import mentions_topic
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.getenv("CLUSTER_MODEL_PATH", os.path.join(PROJECT_ROOT, "cluster_model.pkl"))
+NUM_CLUSTERS = int(os.getenv("CLUSTER_COUNT", "12"))
+HASH_DIM = 2 ** 16
+LOOKBACK_DAYS = 7       # First run only looks this far back
+LABEL_TERMS = 3         # Terms per cluster label
+TERMS_KEPT = 200        # Candidate label terms kept per cluster
+TERM_DECAY = 0.9        # Per-run decay so labels follow drift
+MIN_SIMILARITY = 0.05   # Below this a post fits no center and stays unassigned
+CLUSTER_RETRIES = 3     # Runs that consider a post before it is left unassigned for good
+POOR_FIT = 0.2          # Posts fitting worse than this may form a new cluster
+UNFIT_SHARE = 0.8       # A term is a new-theme candidate if this share of its posts fit poorly...
+NEW_TERM_WEIGHT = 0.01  # ...and no center weights it more than this
+MIN_NEW_CLUSTER = 5     # Posts sharing two candidate terms needed before a center is given up
+REASSIGNMENT_RATIO = 0.01  # Centers with fewer posts than this share of the largest are starved
+
+TRACKED_TOPIC = -1      # 'cluster' value for posts that match a tracked topic
+# Posts that fit no cluster get 'cluster': None and a 'cluster_attempts' count
+
+
+def _bucket(term):
+    """Hash a term to (bucket, sign)"""
+    h = zlib.crc32(term.encode("utf-8"))
+    return h % HASH_DIM, 1.0 if h & 0x80000000 else -1.0
+
+
+def _terms(text):
+    return [t for t in tokenize(text) if len(t) > 2 and not t.isdigit()]
+
+
+class ClusterModel:
+    """Hashed document frequencies plus mini-batch k-means centers"""
+
+    def __init__(self, k=NUM_CLUSTERS):
+        self.k = k
+        self.doc_freq = np.zeros(HASH_DIM, dtype=np.int64)
+        self.num_docs = 0
+        self.centers = None                      # k x HASH_DIM, unit rows
+        self.center_counts = np.zeros(k, dtype=np.int64)
+        self.term_counts = [{} for _ in range(k)]
+        self.watermark = None                    # Latest created_utc processed
+        self.cluster_ids = list(range(k))        # Center -> cluster id stored on posts
+        self.next_cluster_id = k
+        self.retired = []                        # Cluster ids given up by the last batch
+        self.rng = np.random.default_rng(0)
+
+    def idf(self, buckets):
+        return np.log((1 + self.num_docs) / (1 + self.doc_freq[buckets])) + 1
+
+    def vectorize(self, terms):
+        """Sparse, L2-normalized TF-IDF vector as (buckets, values)"""
+        weights = {}
+        for term in terms:
+            bucket, sign = _bucket(term)
+            weights[bucket] = weights.get(bucket, 0.0) + sign
+
+        buckets = np.fromiter(weights.keys(), dtype=np.int64, count=len(weights))
+        tf = np.fromiter(weights.values(), dtype=np.float64, count=len(weights))
+        values = np.sign(tf) * (1 + np.log(np.maximum(np.abs(tf), 1))) * self.idf(buckets)
+        norm = np.linalg.norm(values)
+        return buckets, (values / norm if norm else values)
+
+    def _similarities(self, vectors):
+        """Cosine similarity of every doc to every center, docs x k"""
+        return np.array([self.centers[:, buckets] @ values for buckets, values in vectors])
+
+    def _seed(self, vectors):
+        """k-means++ seeding from distinct docs"""
+        self.centers = np.zeros((self.k, HASH_DIM), dtype=np.float32)
+        first = self.rng.integers(len(vectors))
+        self.centers[0, vectors[first][0]] = vectors[first][1]
+        # Squared distance between unit vectors is 2 - 2 * cosine
+        best = np.array([self.centers[0, b] @ v for b, v in vectors])
+        for c in range(1, self.k):
+            distances = np.maximum(2 - 2 * best, 0)
+            chosen = self.rng.choice(len(vectors), p=distances / distances.sum())
+            buckets, values = vectors[chosen]
+            self.centers[c, buckets] = values
+            best = np.maximum(best, [self.centers[c, b] @ v for b, v in vectors])
+
+    def _redundant_center(self):
+        """Smaller center of the most similar pair of centers"""
+        overlap = self.centers @ self.centers.T
+        np.fill_diagonal(overlap, -np.inf)
+        a, b = np.unravel_index(np.argmax(overlap), overlap.shape)
+        return a if self.center_counts[a] <= self.center_counts[b] else b
+
+    def _new_group(self, vectors, similarities):
+        """
+        Poorly fitting docs that share a theme no center covers yet
+
+        Candidate terms are those no center weights and that (almost) only
+        poorly fitting docs use. Docs holding one candidate term form a group
+        only if at least MIN_NEW_CLUSTER of them also share a second one, so
+        outliers that happen to share one rare word never qualify.
+
+        Returns:
+            list: Indices of the group's docs, or None if there is no group
+        """
+        poorly_fit = similarities.max(axis=1) < POOR_FIT
+        if poorly_fit.sum() < MIN_NEW_CLUSTER:
+            return None
+
+        used = np.bincount(np.concatenate([b for b, _ in vectors]), minlength=HASH_DIM)
+        used_poorly = np.bincount(
+            np.concatenate([b for (b, _), poor in zip(vectors, poorly_fit) if poor]), minlength=HASH_DIM
+        )
+        candidates = np.flatnonzero(
+            (used_poorly >= MIN_NEW_CLUSTER)
+            & (used_poorly >= UNFIT_SHARE * used)
+            & (np.abs(self.centers).max(axis=0) < NEW_TERM_WEIGHT)
+        )
+
+        for term in candidates[np.argsort(-used_poorly[candidates])]:
+            members = [i for i, (b, _) in enumerate(vectors) if poorly_fit[i] and term in b]
+            shared = np.bincount(np.concatenate([vectors[i][0] for i in members]), minlength=HASH_DIM)
+            shared[term] = 0
+            if shared[candidates].max() >= MIN_NEW_CLUSTER:
+                return members
+        return None
+
+    def _reseed(self, vectors, similarities):
+        """
+        Give up one center for a new group of poorly fitting docs
+
+        A starved center (or, if none is, the smaller of the two most similar
+        centers) is moved onto the group and gets a new cluster id. Its old id
+        is retired rather than reused, so its posts and history stay valid.
+
+        Returns:
+            bool: Whether a center was reseeded
+        """
+        members = self._new_group(vectors, similarities)
+        if members is None:
+            return False
+
+        threshold = REASSIGNMENT_RATIO * max(self.center_counts.max(), 1)
+        starved = [c for c in range(self.k) if self.center_counts[c] <= threshold]
+        c = min(starved, key=lambda s: self.center_counts[s]) if starved else int(self._redundant_center())
+
+        self.centers[c] = 0
+        for i in members:
+            self.centers[c, vectors[i][0]] += vectors[i][1]
+        self.centers[c] /= np.linalg.norm(self.centers[c])
+        self.center_counts[c] = 0
+        self.term_counts[c] = {}
+        self.retired.append(self.cluster_ids[c])
+        self.cluster_ids[c] = self.next_cluster_id
+        self.next_cluster_id += 1
+        return True
+
+    def fit_batch(self, docs, counted=None):
+        """
+        Update the model with a batch of tokenized docs (mini-batch k-means)
+
+        The whole batch is assigned against the current centers first, then
+        centers move towards their docs with per-center learning rates.
+
+        Args:
+            docs (list): List of term lists
+            counted (list): Per doc, whether an earlier batch already added it
+                            to the document frequencies (a retry)
+
+        Returns:
+            list: Cluster id per doc, None for docs that fit no cluster.
+                  All None while there are too few distinct docs to seed.
+        """
+        self.retired = []
+        seeding = self.centers is None
+        if seeding and len({frozenset(terms) for terms in docs}) < self.k:
+            return [None] * len(docs)
+
+        counted = counted or [False] * len(docs)
+        for terms, seen in zip(docs, counted):
+            if not seen:
+                self.doc_freq[np.unique([_bucket(t)[0] for t in terms])] += 1
+                self.num_docs += 1
+
+        vectors = [self.vectorize(terms) for terms in docs]
+
+        if seeding:
+            distinct = {}
+            for terms, vector in zip(docs, vectors):
+                distinct.setdefault(frozenset(terms), vector)
+            self._seed(list(distinct.values()))
+
+        similarities = self._similarities(vectors)
+        if not seeding and self._reseed(vectors, similarities):
+            similarities = self._similarities(vectors)
+
+        centers = [
+            int(np.argmax(row)) if row.max() >= MIN_SIMILARITY else None
+            for row in similarities
+        ]
+
+        for (buckets, values), terms, c in zip(vectors, docs, centers):
+            if c is None:
+                continue
+            self.center_counts[c] += 1
+            eta = 1.0 / self.center_counts[c]
+            self.centers[c] *= (1 - eta)
+            self.centers[c, buckets] += eta * values
+            norm = np.linalg.norm(self.centers[c])
+            if norm:
+                self.centers[c] /= norm
+
+            counts = self.term_counts[c]
+            for term in set(terms):
+                counts[term] = counts.get(term, 0) + 1
+        return [None if c is None else self.cluster_ids[c] for c in centers]
+
+    def finish_run(self):
+        """Decay and prune candidate label terms"""
+        for c, counts in enumerate(self.term_counts):
+            top = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:TERMS_KEPT]
+            self.term_counts[c] = {term: count * TERM_DECAY for term, count in top}
+
+    def top_terms(self, c, n=LABEL_TERMS):
+        """Most distinctive frequent terms of a cluster"""
+        counts = self.term_counts[c]
+        if not counts:
+            return []
+        terms = list(counts)
+        idf = self.idf(np.array([_bucket(t)[0] for t in terms]))
+        scores = np.array([counts[t] for t in terms]) * idf
+        scored = sorted(zip(terms, scores), key=lambda item: item[1], reverse=True)
+        return [term for term, _ in scored[:n]]
+
+    def save(self, path=MODEL_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "rb") as f:
+            model = pickle.load(f)
+        if not hasattr(model, "cluster_ids"):
+            # Saved before cluster ids were decoupled from centers
+            model.cluster_ids = list(range(model.k))
+            model.next_cluster_id = model.k
+            model.retired = []
+        return model
+
+
+def run_clustering(database=None, batch_size=1000):
+    """Cluster all new unlabeled posts and store labels and hourly counts"""
+    if database is None:
+        # Imported here so ClusterModel can be used without a MongoDB connection
+        from database.mongo_connector import db as database
+    if not database:
+        return 0
+
+    model = ClusterModel.load()
+    since = model.watermark or datetime.utcnow() - timedelta(days=LOOKBACK_DAYS)
+    # Re-polls can deliver posts a little older than the watermark
+    query = {
+        "created_utc": {"$gte": since - timedelta(days=1)},
+        "$or": [
+            {"cluster": {"$exists": False}},
+            {"cluster": None, "cluster_attempts": {"$lt": CLUSTER_RETRIES}}
+        ],
+        "full_text": {"$exists": True}
+    }
+    projection = {"_id": 0, "id": 1, "full_text": 1, "subreddit": 1, "created_utc": 1, "cluster_attempts": 1}
+    cursor = database.collection.find(query, projection).sort("created_utc", 1)
+
+    clustered = 0
+    batch = []
+    for post in cursor:
+        batch.append(post)
+        if len(batch) >= batch_size:
+            clustered += _process_batch(database, model, batch)
+            batch = []
+    if batch:
+        clustered += _process_batch(database, model, batch)
+
+    if model.centers is not None:
+        model.finish_run()
+        for c, cluster_id in enumerate(model.cluster_ids):
+            terms = model.top_terms(c)
+            database.clusters.update_one(
+                {"cluster": cluster_id},
+                {"$set": {
+                    "label": " / ".join(terms),
+                    "top_terms": terms,
+                    "size": int(model.center_counts[c]),
+                    "updated_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+    model.save()
+
+    print(f"✅ Clustered {clustered} unlabeled posts into {model.k} clusters")
+    return clustered
+
+
+def _process_batch(database, model, posts):
+    tracked = [p for p in posts if mentions_topic(p["full_text"])]
+    unlabeled = [p for p in posts if not mentions_topic(p["full_text"])]
+    docs = [_terms(p["full_text"]) for p in unlabeled]
+    empty = [p for p, terms in zip(unlabeled, docs) if not terms]
+    unlabeled = [p for p, terms in zip(unlabeled, docs) if terms]
+    docs = [terms for terms in docs if terms]
+
+    if tracked:
+        database.collection.update_many(
+            {"id": {"$in": [p["id"] for p in tracked]}},
+            {"$set": {"cluster": TRACKED_TOPIC}}
+        )
+    if empty:
+        # Nothing to cluster on, now or later
+        database.collection.update_many(
+            {"id": {"$in": [p["id"] for p in empty]}},
+            {"$set": {"cluster": None, "cluster_attempts": CLUSTER_RETRIES}}
+        )
+    if not docs:
+        return 0
+
+    # Retried posts are already in the document frequencies
+    assignments = model.fit_batch(docs, [p.get("cluster_attempts", 0) > 0 for p in unlabeled])
+    if model.centers is None:
+        # Not enough distinct posts to seed yet; they are picked up again next run
+        return 0
+
+    # A reseeded center got a new id; the old cluster keeps its label, posts and counts
+    if model.retired:
+        database.clusters.update_many(
+            {"cluster": {"$in": model.retired}},
+            {"$set": {"retired_at": datetime.utcnow()}}
+        )
+
+    by_cluster = {}
+    counts = {}
+    unassigned = []
+    for post, c in zip(unlabeled, assignments):
+        if c is None:
+            unassigned.append(post["id"])
+            continue
+        by_cluster.setdefault(c, []).append(post["id"])
+        hour = post["created_utc"].replace(minute=0, second=0, microsecond=0)
+        key = (c, post["subreddit"], hour)
+        counts[key] = counts.get(key, 0) + 1
+
+    for c, ids in by_cluster.items():
+        database.collection.update_many({"id": {"$in": ids}}, {"$set": {"cluster": c}})
+    if unassigned:
+        # Fits no cluster; a later run reconsiders it until CLUSTER_RETRIES is reached
+        database.collection.update_many(
+            {"id": {"$in": unassigned}},
+            {"$set": {"cluster": None}, "$inc": {"cluster_attempts": 1}}
+        )
+    for (c, subreddit, hour), count in counts.items():
+        database.cluster_counts.update_one(
+            {"cluster": c, "subreddit": subreddit, "hour": hour},
+            {"$inc": {"count": count}},
+            upsert=True
+        )
+
+    model.watermark = max(model.watermark or posts[-1]["created_utc"], posts[-1]["created_utc"])
+    return sum(len(ids) for ids in by_cluster.values())
+
+
+if __name__ == "__main__":
+    # Go through the package so pickles reference database.clustering, not __main__
+    from database import clustering
+    clustering.run_clustering()
@@ -7,13 +7,25 @@ import os
 from pymongo import MongoClient, errors
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from database.topics import topic_regex
+from database.trending import COMMENT_WEIGHT, HALF_LIFE_HOURS, trending_rank, trending_score
 
 load_dotenv()
 
 # Get MongoDB URI from environment
-MONGO_URI = "mongodb://localhost:27017/"
-DB_NAME = "trendradar"
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+DB_NAME = os.getenv("TRENDRADAR_DB", "trendradar")
 COLLECTION_NAME = "reddit_posts"
+ROLLUP_COLLECTION_NAME = "post_rollups_hourly"
+CLUSTER_COLLECTION_NAME = "topic_clusters"
+CLUSTER_COUNTS_COLLECTION_NAME = "topic_cluster_counts"
+# Posts older than this are compacted by database/retention.py
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "30"))
+
+def retention_cutoff(now=None):
+    """Start of the oldest day whose posts are still kept raw"""
+    today = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=RETENTION_DAYS)
 
 class MongoDB:
     """Singleton MongoDB connection"""
@@ -32,6 +44,24 @@ class MongoDB:
                 cls._instance.collection.create_index("created_utc")
                 cls._instance.collection.create_index("subreddit")
                 cls._instance.collection.create_index([("full_text", "text")])  # Text index for search
+                # Top-K trending by window, optionally per subreddit
+                cls._instance.collection.create_index([("trending_rank", -1), ("created_utc", -1)])
+                cls._instance.collection.create_index([("subreddit", 1), ("trending_rank", -1)])
+                cls._instance.backfill_trending_ranks()
+                
+                # Hourly per-subreddit aggregates of compacted posts
+                cls._instance.rollups = cls._instance.db[ROLLUP_COLLECTION_NAME]
+                cls._instance.rollups.create_index([("subreddit", 1), ("hour", 1)], unique=True)
+                cls._instance.rollups.create_index("hour")
+                
+                # Emergent topic clusters of unlabeled posts
+                cls._instance.clusters = cls._instance.db[CLUSTER_COLLECTION_NAME]
+                cls._instance.clusters.create_index("cluster", unique=True)
+                cls._instance.cluster_counts = cls._instance.db[CLUSTER_COUNTS_COLLECTION_NAME]
+                cls._instance.cluster_counts.create_index(
+                    [("cluster", 1), ("subreddit", 1), ("hour", 1)], unique=True
+                )
+                cls._instance.cluster_counts.create_index("hour")
                 
                 print("✅ Connected to MongoDB successfully")
             except errors.ConnectionFailure as e:
@@ -47,7 +77,16 @@ class MongoDB:
         try:
             # Use update_one with upsert to avoid duplicates
             result = 0
+            cutoff = retention_cutoff()
             for post in posts:
+                # Past retention a post is already rolled up (or purged); writing it
+                # again would restore its text or count it twice
+                if post["created_utc"] < cutoff:
+                    continue
+                # Re-polls refresh score/comments, so the rank is recomputed on every write
+                post["trending_rank"] = trending_rank(
+                    post["score"], post["num_comments"], post["created_utc"]
+                )
                 self.collection.update_one(
                     {"id": post["id"]},
                     {"$set": post},
@@ -83,12 +122,109 @@ class MongoDB:
         
         # Text search query
         query = {
-            "full_text": {"$regex": topic, "$options": "i"},
+            "full_text": {"$regex": topic_regex(topic), "$options": "i"},
             "created_utc": {"$gte": start, "$lte": end}
         }
         
         cursor = self.collection.find(query).sort("created_utc", 1)
         return list(cursor)
+    
+    def get_hourly_rollups(self, start_date=None, end_date=None, subreddits=None):
+        """Retrieve hourly rollups of compacted posts, oldest first"""
+        query = {}
+        
+        if start_date or end_date:
+            query["hour"] = {}
+            if start_date:
+                query["hour"]["$gte"] = start_date
+            if end_date:
+                query["hour"]["$lte"] = end_date
+        
+        if subreddits:
+            query["subreddit"] = {"$in": list(subreddits)}
+        
+        cursor = self.rollups.find(query, {"_id": 0, "post_ids": 0}).sort("hour", 1)
+        return list(cursor)
+    
+    def get_cluster_counts(self, start_date=None, end_date=None, subreddits=None):
+        """Daily post counts per emergent cluster, with cluster labels"""
+        match = {}
+        
+        if start_date or end_date:
+            match["hour"] = {}
+            if start_date:
+                match["hour"]["$gte"] = start_date
+            if end_date:
+                match["hour"]["$lte"] = end_date
+        
+        if subreddits:
+            match["subreddit"] = {"$in": list(subreddits)}
+        
+        labels = {c["cluster"]: c["label"] for c in self.clusters.find({}, {"cluster": 1, "label": 1})}
+        cursor = self.cluster_counts.aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": {
+                    "cluster": "$cluster",
+                    "date": {"$dateTrunc": {"date": "$hour", "unit": "day"}}
+                },
+                "count": {"$sum": "$count"}
+            }},
+            {"$sort": {"_id.date": 1}}
+        ])
+        return [
+            {
+                "cluster": row["_id"]["cluster"],
+                "label": labels.get(row["_id"]["cluster"], ""),
+                "date": row["_id"]["date"],
+                "count": row["count"]
+            }
+            for row in cursor
+        ]
+    
+    def backfill_trending_ranks(self, rebuild=False):
+        """
+        Compute trending_rank for stored posts that lack it
+        
+        Pass rebuild=True after changing TRENDING_HALF_LIFE_HOURS to
+        recompute every post with the new half-life.
+        """
+        query = {} if rebuild else {"trending_rank": {"$exists": False}}
+        engagement = {"$max": [
+            {"$add": ["$score", {"$multiply": ["$num_comments", COMMENT_WEIGHT]}]},
+            1
+        ]}
+        rank = {"$add": [
+            {"$log": [engagement, 2]},
+            {"$divide": [{"$toLong": "$created_utc"}, HALF_LIFE_HOURS * 3600 * 1000]}
+        ]}
+        result = self.collection.update_many(query, [{"$set": {"trending_rank": rank}}])
+        return result.modified_count
+    
+    def get_trending(self, window, subreddits=None, k=15):
+        """
+        Top-K posts by decayed trending score
+        
+        Args:
+            window (timedelta): Only posts created within this window
+            subreddits (list): Restrict to these subreddits (all if empty)
+            k (int): Number of posts to return
+        
+        Returns:
+            list: Posts ordered by trending score, each with 'trending_score' set
+        """
+        now = datetime.utcnow()
+        query = {"created_utc": {"$gte": now - window, "$lte": now}}
+        if subreddits:
+            query["subreddit"] = {"$in": list(subreddits)}
+        
+        cursor = self.collection.find(query).sort("trending_rank", -1).limit(k)
+        posts = list(cursor)
+        for post in posts:
+            post["trending_score"] = trending_score(
+                post["score"], post["num_comments"], post["created_utc"], now
+            )
+        return posts
 
 # Global instance
 db = MongoDB()
@@ -110,3 +246,21 @@ def get_topic_mentions(topic, days=7):
     if db:
         return db.get_topic_mentions(topic, days)
     return []
+
+def get_hourly_rollups(start_date=None, end_date=None, subreddits=None):
+    """Convenience function to get hourly rollups"""
+    if db:
+        return db.get_hourly_rollups(start_date, end_date, subreddits)
+    return []
+
+def get_cluster_counts(start_date=None, end_date=None, subreddits=None):
+    """Convenience function to get daily emergent cluster counts"""
+    if db:
+        return db.get_cluster_counts(start_date, end_date, subreddits)
+    return []
+
+def get_trending(window, subreddits=None, k=15):
+    """Convenience function to get top-K trending posts"""
+    if db:
+        return db.get_trending(window, subreddits, k)
+    return []
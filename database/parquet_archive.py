@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Columnar Parquet archive for TrendRadar
+
+Posts are exported from MongoDB into Hive-style partitions:
+
+    <ARCHIVE_DIR>/day=YYYY-MM-DD/subreddit=<name>/part-0.parquet
+
+Long-range analysis reads these files instead of the live database,
+pruning partitions by day/subreddit, reading only the requested columns
+and memory-mapping the files.
+"""
+
+import os
+import sys
+import json
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.topics import topic_regex
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", os.path.join(PROJECT_ROOT, "archive"))
+STATE_FILE = "_export_state.json"
+DAY_FORMAT = "%Y-%m-%d"
+
+# Column layout of the archived files (subreddit lives in the partition path)
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("title", pa.string()),
+    ("text", pa.string()),
+    ("full_text", pa.string()),
+    ("author", pa.string()),
+    ("created_utc", pa.timestamp("us")),
+    ("score", pa.int64()),
+    ("num_comments", pa.int64()),
+    ("url", pa.string()),
+    ("upvote_ratio", pa.float64()),
+    ("collected_at", pa.timestamp("us")),
+    ("trending_rank", pa.float64()),
+])
+
+PARTITION_SCHEMA = pa.schema([("day", pa.string()), ("subreddit", pa.string())])
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+# What readers see: file columns plus the partition keys
+DATASET_SCHEMA = pa.unify_schemas([SCHEMA, PARTITION_SCHEMA])
+
+
+def _partition_path(day, subreddit):
+    return os.path.join(ARCHIVE_DIR, f"day={day}", f"subreddit={subreddit}")
+
+
+def _load_state():
+    path = os.path.join(ARCHIVE_DIR, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_state(state):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with open(os.path.join(ARCHIVE_DIR, STATE_FILE), "w") as f:
+        json.dump(state, f)
+
+
+def write_partition(day, subreddit, posts):
+    """
+    Write one day/subreddit partition, merging into any existing file
+
+    Rows already archived keep their place unless `posts` holds a newer
+    copy of the same id, so posts that were compacted or purged from
+    MongoDB are never dropped from the archive.
+
+    Args:
+        day (str): Partition day as YYYY-MM-DD
+        subreddit (str): Subreddit name
+        posts (list): Post documents for that partition
+
+    Returns:
+        int: Number of posts exported
+    """
+    rows = sorted(posts, key=lambda p: p["created_utc"])
+    table = pa.Table.from_pylist(
+        [{name: p.get(name) for name in SCHEMA.names} for p in rows],
+        schema=SCHEMA
+    )
+
+    path = _partition_path(day, subreddit)
+    existing_file = os.path.join(path, "part-0.parquet")
+    if os.path.exists(existing_file):
+        existing = pq.read_table(existing_file, schema=SCHEMA)
+        keep = pc.invert(pc.is_in(existing["id"], value_set=table["id"]))
+        table = pa.concat_tables([existing.filter(keep), table]).sort_by("created_utc")
+
+    os.makedirs(path, exist_ok=True)
+    tmp_file = os.path.join(path, ".part-0.parquet.tmp")  # dot prefix: ignored by readers
+    pq.write_table(table, tmp_file, compression="zstd")
+    os.replace(tmp_file, existing_file)
+    return len(rows)
+
+
+def export_day(collection, day, subreddits=None):
+    """Export all posts created on `day` (YYYY-MM-DD), one file per subreddit"""
+    start = datetime.strptime(day, DAY_FORMAT)
+    query = {
+        "created_utc": {"$gte": start, "$lt": start + timedelta(days=1)},
+        # Compacted posts have lost their text; the archive already holds it
+        "compacted_at": {"$exists": False}
+    }
+    if subreddits:
+        query["subreddit"] = {"$in": list(subreddits)}
+
+    by_subreddit = {}
+    for post in collection.find(query, {"_id": 0}):
+        by_subreddit.setdefault(post["subreddit"], []).append(post)
+
+    return sum(write_partition(day, sub, posts) for sub, posts in by_subreddit.items())
+
+
+def export_incremental(collection):
+    """
+    Re-export every partition touched since the last export
+
+    Posts are upserted on each poll, so a partition is rewritten whenever
+    any of its posts was collected after the stored watermark.
+    """
+    state = _load_state()
+    match = {}
+    if state.get("watermark"):
+        match["collected_at"] = {"$gt": datetime.fromisoformat(state["watermark"])}
+
+    touched = list(collection.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": DAY_FORMAT, "date": "$created_utc"}},
+                "subreddit": "$subreddit"
+            },
+            "last_collected": {"$max": "$collected_at"}
+        }}
+    ]))
+    if not touched:
+        return 0
+
+    days = {}
+    for group in touched:
+        days.setdefault(group["_id"]["day"], set()).add(group["_id"]["subreddit"])
+
+    written = 0
+    for day, subreddits in sorted(days.items()):
+        written += export_day(collection, day, subreddits)
+
+    watermark = max(group["last_collected"] for group in touched)
+    _save_state({"watermark": watermark.isoformat()})
+    return written
+
+
+def backfill(collection, start_date=None, end_date=None):
+    """Export every day between start_date and end_date (defaults to all data)"""
+    if start_date is None or end_date is None:
+        first = collection.find_one({}, sort=[("created_utc", 1)])
+        last = collection.find_one({}, sort=[("created_utc", -1)])
+        if not first:
+            return 0
+        start_date = start_date or first["created_utc"]
+        end_date = end_date or last["created_utc"]
+
+    written = 0
+    day = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= end_date:
+        written += export_day(collection, day.strftime(DAY_FORMAT))
+        day += timedelta(days=1)
+    return written
+
+
+def read_posts(start_date=None, end_date=None, subreddits=None, columns=None):
+    """
+    Read archived posts as a DataFrame without touching MongoDB
+
+    Args:
+        start_date (datetime): Earliest created_utc
+        end_date (datetime): Latest created_utc
+        subreddits (list): Only these subreddits (all if empty)
+        columns (list): Columns to load (all if None)
+
+    Returns:
+        DataFrame: Matching posts
+    """
+    filters = []
+    if start_date:
+        filters.append(("day", ">=", start_date.strftime(DAY_FORMAT)))
+        filters.append(("created_utc", ">=", start_date))
+    if end_date:
+        filters.append(("day", "<=", end_date.strftime(DAY_FORMAT)))
+        filters.append(("created_utc", "<=", end_date))
+    if subreddits:
+        filters.append(("subreddit", "in", list(subreddits)))
+
+    if not os.path.isdir(ARCHIVE_DIR):
+        table = DATASET_SCHEMA.empty_table()
+        return (table.select(columns) if columns else table).to_pandas()
+
+    table = pq.read_table(
+        ARCHIVE_DIR,
+        columns=columns,
+        filters=filters or None,
+        schema=DATASET_SCHEMA,
+        partitioning=PARTITIONING,
+        memory_map=True
+    )
+    return table.to_pandas()
+
+
+def get_topic_mentions(topic, days=7, subreddits=None):
+    """Archive counterpart of mongo_connector.get_topic_mentions"""
+    end = datetime.utcnow()
+    start = end - timedelta(days=days)
+    df = read_posts(start, end, subreddits, columns=["created_utc", "subreddit", "full_text"])
+    matches = df[df["full_text"].str.contains(topic_regex(topic), case=False, na=False)]
+    return matches.sort_values("created_utc")
+
+
+if __name__ == "__main__":
+    from database.mongo_connector import db
+
+    if not db:
+        sys.exit(1)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--backfill":
+        print("Backfilling Parquet archive...")
+        count = backfill(db.collection)
+    else:
+        print("Exporting new posts to Parquet archive...")
+        count = export_incremental(db.collection)
+    print(f"✅ Wrote {count} posts to {ARCHIVE_DIR}")
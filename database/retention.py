@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Retention policy for TrendRadar
+
+Keeps reddit_posts bounded. Once a post is older than RETENTION_DAYS it is
+compacted: its text goes to the Parquet archive, its counts and topic
+mentions are folded into the hourly rollups, and its bulky text fields are
+dropped. A TTL index then expires compacted posts after
+RETENTION_PURGE_AFTER_DAYS.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from pymongo import errors
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.mongo_connector import db, retention_cutoff
+from database.parquet_archive import DAY_FORMAT, export_day
+from database.sketches import empty_hll, hll_add
+from database.topics import TOPIC_PATTERNS
+from database.trending import engagement_score
+
+load_dotenv()
+
+# Configuration (RETENTION_DAYS lives in mongo_connector, which also enforces it on writes)
+PURGE_AFTER_DAYS = int(os.getenv("RETENTION_PURGE_AFTER_DAYS", "7"))
+ARCHIVE_TEXT = os.getenv("RETENTION_ARCHIVE_TEXT", "true").lower() == "true"
+BULKY_FIELDS = ["text", "full_text"]
+TTL_INDEX_NAME = "compacted_at_ttl"
+
+
+def ensure_ttl_index(collection):
+    """Create the TTL index on compacted_at, or update its expiry if it changed"""
+    seconds = PURGE_AFTER_DAYS * 24 * 3600
+    try:
+        collection.create_index("compacted_at", expireAfterSeconds=seconds, name=TTL_INDEX_NAME)
+    except errors.OperationFailure:
+        collection.database.command(
+            "collMod", collection.name,
+            index={"name": TTL_INDEX_NAME, "expireAfterSeconds": seconds}
+        )
+
+
+def pending_days(collection, cutoff):
+    """Days (YYYY-MM-DD) before cutoff that still hold uncompacted posts"""
+    groups = collection.aggregate([
+        {"$match": {"created_utc": {"$lt": cutoff}, "compacted_at": {"$exists": False}}},
+        {"$group": {"_id": {"$dateToString": {"format": DAY_FORMAT, "date": "$created_utc"}}}},
+        {"$sort": {"_id": 1}}
+    ])
+    return [group["_id"] for group in groups]
+
+
+def compact_day(database, day):
+    """
+    Compact every uncompacted post created on one day
+
+    Each rollup document lists the post ids it has counted, and only
+    unlisted ids are added, so rerunning a day after a crash between the
+    rollup and the final strip never counts a post twice.
+
+    Args:
+        database (MongoDB): Connected database wrapper
+        day (str): Day as YYYY-MM-DD
+
+    Returns:
+        int: Number of posts compacted
+    """
+    if ARCHIVE_TEXT:
+        export_day(database.collection, day)
+
+    start = datetime.strptime(day, DAY_FORMAT)
+    projection = {"_id": 0, "id": 1, "subreddit": 1, "created_utc": 1,
+                  "score": 1, "num_comments": 1, "author": 1, "full_text": 1}
+    cursor = database.collection.find({
+        "created_utc": {"$gte": start, "$lt": start + timedelta(days=1)},
+        "compacted_at": {"$exists": False}
+    }, projection)
+
+    hours = {}
+    for post in cursor:
+        hour = post["created_utc"].replace(minute=0, second=0, microsecond=0)
+        hours.setdefault((post["subreddit"], hour), []).append(post)
+
+    compacted = 0
+    for (subreddit, hour), posts in hours.items():
+        key = {"subreddit": subreddit, "hour": hour}
+        existing = database.rollups.find_one(key, {"authors_hll": 1, "post_ids": 1}) or {}
+        counted = set(existing.get("post_ids", []))
+        new_posts = [p for p in posts if p["id"] not in counted]
+
+        if new_posts:
+            increments = {
+                "post_count": len(new_posts),
+                "score_sum": sum(p["score"] for p in new_posts),
+                "comments_sum": sum(p["num_comments"] for p in new_posts)
+            }
+            for topic, pattern in TOPIC_PATTERNS.items():
+                increments[f"topic_counts.{topic}"] = sum(
+                    1 for p in new_posts if pattern.search(p.get("full_text") or "")
+                )
+            engagement_max = max(engagement_score(p["score"], p["num_comments"]) for p in new_posts)
+            sketch = hll_add(existing.get("authors_hll") or empty_hll(), (p["author"] for p in new_posts))
+
+            # One atomic update: the counts and the ids they cover land together
+            database.rollups.update_one(
+                key,
+                {
+                    "$inc": increments,
+                    "$max": {"engagement_max": engagement_max},
+                    "$set": {"authors_hll": sketch},
+                    "$push": {"post_ids": {"$each": [p["id"] for p in new_posts]}}
+                },
+                upsert=True
+            )
+
+        result = database.collection.update_many(
+            {"id": {"$in": [p["id"] for p in posts]}},
+            {
+                "$unset": {field: "" for field in BULKY_FIELDS},
+                "$set": {"compacted_at": datetime.utcnow()}
+            }
+        )
+        compacted += result.modified_count
+
+    return compacted
+
+
+def run_retention(database=None):
+    """Compact all posts older than RETENTION_DAYS, one day at a time"""
+    database = database or db
+    if not database:
+        return 0
+
+    ensure_ttl_index(database.collection)
+    cutoff = retention_cutoff()
+
+    total = 0
+    for day in pending_days(database.collection, cutoff):
+        count = compact_day(database, day)
+        print(f"  ✓ Compacted {count} posts from {day}")
+        total += count
+
+    print(f"✅ Retention: compacted {total} posts older than {cutoff.date()}")
+    return total
+
+
+if __name__ == "__main__":
+    run_retention()
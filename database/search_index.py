@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Inverted index and BM25 search over post text for TrendRadar
+
+Each batch of posts is sorted by created_utc before it gets document
+numbers, so postings are (roughly) in time order. Postings are stored per
+term in blocks of delta-encoded varints, and each block records the time
+range it covers, so window-filtered queries skip old blocks without
+decoding them.
+
+The index only covers posts the retention job has not compacted yet:
+posts older than the retention cutoff are pruned, so its size (and the
+cost of saving and reloading it) stays bounded.
+"""
+
+import os
+import re
+import sys
+import math
+import heapq
+import pickle
+from array import array
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", os.path.join(PROJECT_ROOT, "search_index.pkl"))
+INDEX_VERSION = 2
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+BLOCK_SIZE = 128  # Postings per compressed block
+
+EPOCH = datetime(1970, 1, 1)
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from",
+    "has", "have", "i", "if", "in", "into", "is", "it", "its", "me", "my",
+    "of", "on", "or", "so", "that", "the", "their", "there", "this", "to",
+    "was", "we", "were", "what", "when", "which", "will", "with", "you"
+}
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords"""
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def _timestamp(dt):
+    return (dt - EPOCH).total_seconds()
+
+
+def _write_varint(buf, value):
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_varints(buf):
+    value = shift = 0
+    for byte in buf:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+class PostingBlock:
+    """Up to BLOCK_SIZE (doc delta, term frequency) varint pairs"""
+    __slots__ = ("min_time", "max_time", "last_doc", "count", "data")
+
+    def __init__(self, first_doc):
+        self.min_time = math.inf
+        self.max_time = -math.inf
+        self.last_doc = first_doc
+        self.count = 0
+        self.data = bytearray()
+
+    def append(self, doc, tf, created):
+        _write_varint(self.data, doc - self.last_doc)
+        _write_varint(self.data, tf)
+        self.last_doc = doc
+        self.count += 1
+        self.min_time = min(self.min_time, created)
+        self.max_time = max(self.max_time, created)
+
+    def postings(self, first_doc):
+        values = _read_varints(self.data)
+        doc = first_doc
+        for delta in values:
+            doc += delta
+            yield doc, next(values)
+
+
+class SearchIndex:
+    """Incremental inverted index with BM25 ranking"""
+
+    def __init__(self):
+        self.doc_ids = {}              # post id -> doc number
+        self.meta = []                 # doc number -> (id, title, url)
+        self.created = array("d")      # doc number -> created_utc timestamp
+        self.lengths = array("I")      # doc number -> token count
+        self.subreddit_of = array("I") # doc number -> subreddit number
+        self.subreddits = []           # subreddit number -> name
+        self.subreddit_numbers = {}    # name -> subreddit number
+        self.postings = {}             # term -> [(first_doc, PostingBlock), ...]
+        self.doc_freq = {}             # term -> number of docs
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.meta)
+
+    def add_posts(self, posts):
+        """
+        Index a batch of posts, skipping ids that are already indexed
+
+        Args:
+            posts (list): Post dictionaries with id, full_text, created_utc
+
+        Returns:
+            int: Number of newly indexed posts
+        """
+        new_posts = [p for p in posts if p["id"] not in self.doc_ids and p.get("full_text")]
+        new_posts.sort(key=lambda p: p["created_utc"])
+
+        for post in new_posts:
+            doc = len(self.meta)
+            created = _timestamp(post["created_utc"])
+            tokens = tokenize(post["full_text"])
+
+            subreddit = self.subreddit_numbers.get(post["subreddit"])
+            if subreddit is None:
+                subreddit = self.subreddit_numbers[post["subreddit"]] = len(self.subreddits)
+                self.subreddits.append(post["subreddit"])
+
+            self.doc_ids[post["id"]] = doc
+            self.meta.append((post["id"], post["title"], post["url"]))
+            self.created.append(created)
+            self.lengths.append(len(tokens))
+            self.subreddit_of.append(subreddit)
+            self.total_length += len(tokens)
+
+            freqs = {}
+            for token in tokens:
+                freqs[token] = freqs.get(token, 0) + 1
+
+            for term, tf in freqs.items():
+                blocks = self.postings.setdefault(term, [])
+                if not blocks or blocks[-1][1].count >= BLOCK_SIZE:
+                    blocks.append((doc, PostingBlock(doc)))
+                blocks[-1][1].append(doc, tf, created)
+                self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+
+        return len(new_posts)
+
+    def prune(self, cutoff):
+        """
+        Drop posts created before cutoff and renumber the rest
+
+        Args:
+            cutoff (datetime): Oldest created_utc to keep
+
+        Returns:
+            int: Number of posts dropped
+        """
+        limit = _timestamp(cutoff)
+        keep = [doc for doc in range(len(self)) if self.created[doc] >= limit]
+        dropped = len(self) - len(keep)
+        if not dropped:
+            return 0
+
+        # Kept docs keep their relative order, so the deltas stay non-negative
+        renumber = {doc: new for new, doc in enumerate(keep)}
+        postings = {}
+        doc_freq = {}
+        for term, blocks in self.postings.items():
+            kept_blocks = []
+            for first_doc, block in blocks:
+                if block.max_time < limit:
+                    continue
+                for doc, tf in block.postings(first_doc):
+                    new = renumber.get(doc)
+                    if new is None:
+                        continue
+                    if not kept_blocks or kept_blocks[-1][1].count >= BLOCK_SIZE:
+                        kept_blocks.append((new, PostingBlock(new)))
+                    kept_blocks[-1][1].append(new, tf, self.created[doc])
+            if kept_blocks:
+                postings[term] = kept_blocks
+                doc_freq[term] = sum(block.count for _, block in kept_blocks)
+
+        self.meta = [self.meta[doc] for doc in keep]
+        self.doc_ids = {meta[0]: new for new, meta in enumerate(self.meta)}
+        self.created = array("d", (self.created[doc] for doc in keep))
+        self.lengths = array("I", (self.lengths[doc] for doc in keep))
+        self.subreddit_of = array("I", (self.subreddit_of[doc] for doc in keep))
+        self.total_length = sum(self.lengths)
+        self.postings = postings
+        self.doc_freq = doc_freq
+        return dropped
+
+    def search(self, query, start_date=None, end_date=None, subreddits=None, k=20):
+        """
+        Rank posts matching a query with BM25
+
+        Args:
+            query (str): Free-text query
+            start_date (datetime): Earliest created_utc
+            end_date (datetime): Latest created_utc
+            subreddits (list): Restrict to these subreddits (all if empty)
+            k (int): Number of results
+
+        Returns:
+            list: Result dictionaries, best first
+        """
+        n = len(self)
+        if not n:
+            return []
+
+        start = _timestamp(start_date) if start_date else -math.inf
+        end = _timestamp(end_date) if end_date else math.inf
+        allowed = None
+        if subreddits:
+            allowed = {self.subreddit_numbers[name] for name in subreddits if name in self.subreddit_numbers}
+
+        avg_length = self.total_length / n
+        scores = {}
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            df = self.doc_freq[term]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+            for first_doc, block in self.postings[term]:
+                if block.max_time < start or block.min_time > end:
+                    continue
+                for doc, tf in block.postings(first_doc):
+                    if not start <= self.created[doc] <= end:
+                        continue
+                    if allowed is not None and self.subreddit_of[doc] not in allowed:
+                        continue
+                    norm = K1 * (1 - B + B * self.lengths[doc] / avg_length)
+                    scores[doc] = scores.get(doc, 0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        results = []
+        for doc, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1]):
+            post_id, title, url = self.meta[doc]
+            results.append({
+                "id": post_id,
+                "title": title,
+                "url": url,
+                "subreddit": self.subreddits[self.subreddit_of[doc]],
+                "created_utc": EPOCH + timedelta(seconds=self.created[doc]),
+                "relevance": score
+            })
+        return results
+
+    def save(self, path=INDEX_PATH):
+        """Persist the index atomically"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((INDEX_VERSION, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Load a saved index, or return an empty one"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "rb") as f:
+            version, index = pickle.load(f)
+        if version != INDEX_VERSION:
+            print(f"⚠️ Search index at {path} is outdated, rebuild it with --rebuild")
+            return cls()
+        return index
+
+
+_index = None
+
+def update_search_index(posts, cutoff=None):
+    """
+    Add a freshly collected batch to the on-disk index
+
+    Args:
+        posts (list): Collected post dictionaries
+        cutoff (datetime): Retention cutoff; older posts are pruned from the
+                           index and older posts in the batch are not added
+
+    Returns:
+        int: Number of newly indexed posts
+    """
+    global _index
+    if _index is None:
+        _index = SearchIndex.load()
+    pruned = 0
+    if cutoff:
+        posts = [p for p in posts if p["created_utc"] >= cutoff]
+        pruned = _index.prune(cutoff)
+    added = _index.add_posts(posts)
+    if added or pruned:
+        _index.save()
+    return added
+
+
+def rebuild(collection, batch_size=5000):
+    """Build a fresh index from every post in MongoDB"""
+    index = SearchIndex()
+    batch = []
+    projection = {"_id": 0, "id": 1, "title": 1, "url": 1, "subreddit": 1, "full_text": 1, "created_utc": 1}
+    for post in collection.find({"full_text": {"$exists": True}}, projection).sort("created_utc", 1):
+        batch.append(post)
+        if len(batch) >= batch_size:
+            index.add_posts(batch)
+            batch = []
+    index.add_posts(batch)
+    index.save()
+    return len(index)
+
+
+if __name__ == "__main__":
+    sys.path.append(PROJECT_ROOT)
+    # Go through the package so pickles reference database.search_index, not __main__
+    from database import search_index
+    from database.mongo_connector import db
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--rebuild":
+        if not db:
+            sys.exit(1)
+        print("Rebuilding search index from MongoDB...")
+        print(f"✅ Indexed {search_index.rebuild(db.collection)} posts into {INDEX_PATH}")
+    elif len(sys.argv) > 1:
+        index = search_index.SearchIndex.load()
+        for result in index.search(" ".join(sys.argv[1:]), k=10):
+            print(f"{result['relevance']:.2f}  r/{result['subreddit']}  {result['title'][:80]}")
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Mergeable cardinality sketch for TrendRadar rollups
+
+A small HyperLogLog: 2**PRECISION one-byte registers, stored as raw bytes
+so it fits in a MongoDB document and merges with a per-register max.
+"""
+
+import hashlib
+import math
+
+PRECISION = 10
+NUM_REGISTERS = 1 << PRECISION
+
+
+def empty_hll():
+    """New sketch with all registers at zero"""
+    return bytes(NUM_REGISTERS)
+
+
+def hll_add(registers, values):
+    """
+    Add values to a sketch
+
+    Args:
+        registers (bytes): Existing sketch
+        values (iterable): Strings to count
+
+    Returns:
+        bytes: Updated sketch
+    """
+    registers = bytearray(registers)
+    for value in values:
+        h = int.from_bytes(hashlib.sha1(str(value).encode("utf-8")).digest()[:8], "big")
+        index = h >> (64 - PRECISION)
+        rest = h & ((1 << (64 - PRECISION)) - 1)
+        rank = (64 - PRECISION) - rest.bit_length() + 1
+        if rank > registers[index]:
+            registers[index] = rank
+    return bytes(registers)
+
+
+def hll_merge(a, b):
+    """Union of two sketches"""
+    return bytes(max(x, y) for x, y in zip(a, b))
+
+
+def hll_count(registers):
+    """Estimated number of distinct values in a sketch"""
+    m = NUM_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / sum(2.0 ** -r for r in registers)
+
+    zeros = registers.count(0)
+    if estimate <= 2.5 * m and zeros:
+        # Linear counting is more accurate for small cardinalities
+        return round(m * math.log(m / zeros))
+    return round(estimate)
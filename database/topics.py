@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Topics tracked by TrendRadar
+
+Every consumer (dashboard, MongoDB and archive queries, retention rollups,
+clustering) matches topics through topic_regex, so a post counts as a
+mention in all of them or in none.
+"""
+
+import re
+
+TOPICS = [
+    "AI", "Machine Learning", "Deep Learning", "ChatGPT",
+    "Neural Networks", "Robotics", "Data Science", "Python"
+]
+
+
+def topic_regex(topic):
+    """
+    Regex for a whole-word, case-insensitive mention of a topic
+
+    Whole words only, so e.g. "said" is not a mention of "AI". The pattern
+    works with re, pandas str.contains and MongoDB $regex alike.
+    """
+    return r"\b" + re.escape(topic) + r"\b"
+
+
+TOPIC_PATTERNS = {topic: re.compile(topic_regex(topic), re.IGNORECASE) for topic in TOPICS}
+ANY_TOPIC_PATTERN = re.compile("|".join(topic_regex(topic) for topic in TOPICS), re.IGNORECASE)
+
+
+def mentions_topic(text):
+    """Whether text mentions any tracked topic"""
+    return bool(ANY_TOPIC_PATTERN.search(text or ""))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Trending score definition for TrendRadar
+
+A post's trending score is its engagement decayed by age:
+
+    trending_score = engagement * 2 ** (-age / half_life)
+
+Ranking posts by that value at any fixed "now" gives the same order as
+ranking by the time-invariant key
+
+    trending_rank = log2(engagement) + created_utc / half_life
+
+so the key is computed once when a post is written (or re-polled) and
+stored on the document, where an index can serve top-K directly.
+"""
+
+import math
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Comments are worth more than upvotes - they signal real discussion
+COMMENT_WEIGHT = 3
+# Hours for a post's trending score to halve
+HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "12"))
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def engagement_score(score, num_comments):
+    """Engagement of a post: upvotes plus weighted comments"""
+    return score + num_comments * COMMENT_WEIGHT
+
+
+def _decayed_engagement(score, num_comments):
+    # Clamped to 1 so the log in trending_rank is defined; trending_score
+    # uses the same value, so stored order and reported score always agree
+    return max(engagement_score(score, num_comments), 1)
+
+
+def trending_rank(score, num_comments, created_utc, half_life_hours=HALF_LIFE_HOURS):
+    """
+    Time-invariant sort key for the decayed trending score
+
+    Args:
+        score (int): Post score
+        num_comments (int): Number of comments
+        created_utc (datetime): Post creation time (naive UTC)
+        half_life_hours (float): Decay half-life
+
+    Returns:
+        float: Key whose descending order matches the trending order
+    """
+    engagement = _decayed_engagement(score, num_comments)
+    created_seconds = (created_utc - EPOCH).total_seconds()
+    return math.log2(engagement) + created_seconds / (half_life_hours * 3600)
+
+
+def trending_score(score, num_comments, created_utc, now=None, half_life_hours=HALF_LIFE_HOURS):
+    """Decayed trending score of a post as of `now` (defaults to current UTC)"""
+    now = now or datetime.utcnow()
+    age_hours = max((now - created_utc).total_seconds() / 3600, 0)
+    return _decayed_engagement(score, num_comments) * 2 ** (-age_hours / half_life_hours)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Reddit's JSON listings, for load-testing the collector
+
+Serves /r/<subreddit>/<sort>.json for any subreddit name with synthetic,
+deterministic posts. Each subreddit gets a steady stream of new posts and
+scores that grow over time, so ETags change realistically. Latency, 5xx
+errors and a fixed-window rate limit (429 + x-ratelimit-* headers) can be
+injected.
+
+    python loadtest/fake_reddit.py --port 8080 --latency-ms 50 --error-rate 0.01
+"""
+
+import re
+import sys
+import json
+import time
+import zlib
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+LISTING_PATH = re.compile(r"^/r/([^/]+)/(new|hot|top|rising)\.json$")
+WORDS = (
+    "ai model python gpu release open source neural network data science "
+    "robot chatgpt llm training benchmark rust compiler startup research "
+    "privacy cloud chip quantum agent dataset paper launch update"
+).split()
+
+
+class FakeReddit:
+    """Synthetic listing generator plus injected faults and rate limiting"""
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 rate_limit=0, rate_window=60, posts_per_hour=12,
+                 backlog_hours=48, score_refresh=300, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit      # Requests per window, 0 disables
+        self.rate_window = rate_window
+        self.posts_per_hour = posts_per_hour
+        self.score_refresh = score_refresh  # Seconds between score changes
+        self.seed = seed
+        self.start = time.time() - backlog_hours * 3600
+
+        self.lock = threading.Lock()
+        self.window_start = time.time()
+        self.window_used = 0
+        self.stats = {}
+        self.random = random.Random(seed)
+
+    # ------------------------------------------------------------------
+    # Synthetic data
+    # ------------------------------------------------------------------
+    def _sub_hash(self, subreddit):
+        return zlib.crc32(f"{self.seed}:{subreddit}".encode())
+
+    def _post_count(self, subreddit, now):
+        # Every subreddit posts at a slightly different rate
+        rate = self.posts_per_hour * (0.5 + (self._sub_hash(subreddit) % 100) / 100)
+        return int((now - self.start) / 3600 * rate)
+
+    def _post(self, subreddit, k, now):
+        rng = random.Random(self._sub_hash(subreddit) * 1_000_003 + k)
+        rate = self.posts_per_hour * (0.5 + (self._sub_hash(subreddit) % 100) / 100)
+        created = self.start + k * 3600 / rate
+        age_hours = max(now - created, 0) / 3600
+        refresh_age = int((now - created) // self.score_refresh) * self.score_refresh / 3600
+        quality = rng.paretovariate(1.5)
+        post_id = f"{self._sub_hash(subreddit):08x}{k:06x}"
+        title = " ".join(rng.choices(WORDS, k=rng.randint(4, 10)))
+        return {
+            "id": post_id,
+            "title": title.capitalize(),
+            "selftext": " ".join(rng.choices(WORDS, k=rng.randint(0, 60))),
+            "author": f"user{rng.randint(1, 50000)}",
+            "created_utc": created,
+            "score": int(quality * 10 * min(refresh_age, 24)),
+            "num_comments": int(quality * 2 * min(refresh_age, 24)),
+            "permalink": f"/r/{subreddit}/comments/{post_id}/",
+            "upvote_ratio": round(0.5 + rng.random() / 2, 2),
+            "_age_hours": age_hours,
+        }
+
+    def listing(self, subreddit, sort, limit, after):
+        """Build one listing page and its ETag"""
+        now = time.time()
+        count = self._post_count(subreddit, now)
+
+        if sort == "new":
+            # Post numbers are the cursor, so only the requested page is generated
+            first = int(after[-6:], 16) - 1 if after else count - 1
+            last = max(first - limit, -1)
+            page = [self._post(subreddit, k, now) for k in range(first, last, -1)]
+            next_after = f"t3_{page[-1]['id']}" if page and last >= 0 else None
+        else:
+            # Ranked listings only ever look at the most recent posts
+            depth = 50 if sort == "rising" else 500
+            posts = [self._post(subreddit, k, now) for k in range(count - 1, max(count - depth, 0) - 1, -1)]
+            if sort == "hot":
+                posts.sort(key=lambda p: p["score"] / (p["_age_hours"] + 2) ** 1.5, reverse=True)
+            else:
+                posts.sort(key=lambda p: p["score"], reverse=True)
+
+            position = 0
+            if after:
+                ids = [f"t3_{p['id']}" for p in posts]
+                position = ids.index(after) + 1 if after in ids else len(posts)
+            page = posts[position:position + limit]
+            next_after = f"t3_{page[-1]['id']}" if page and position + limit < len(posts) else None
+
+        children = []
+        for post in page:
+            data = {k: v for k, v in post.items() if not k.startswith("_")}
+            children.append({"kind": "t3", "data": data})
+
+        body = json.dumps({
+            "kind": "Listing",
+            "data": {"after": next_after, "before": None, "dist": len(children), "children": children}
+        }).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        return body, etag
+
+    # ------------------------------------------------------------------
+    # Faults and accounting
+    # ------------------------------------------------------------------
+    def record(self, status):
+        with self.lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+    def snapshot(self):
+        """Copy of response counts by status code"""
+        with self.lock:
+            return dict(self.stats)
+
+    def take_token(self):
+        """Count a request against the rate limit; returns (allowed, headers)"""
+        with self.lock:
+            now = time.time()
+            if now - self.window_start >= self.rate_window:
+                self.window_start = now
+                self.window_used = 0
+            self.window_used += 1
+            reset = max(self.rate_window - (now - self.window_start), 0)
+            if not self.rate_limit:
+                return True, {}
+            remaining = max(self.rate_limit - self.window_used, 0)
+            headers = {
+                "x-ratelimit-used": str(self.window_used),
+                "x-ratelimit-remaining": str(remaining),
+                "x-ratelimit-reset": str(int(reset) + 1),
+            }
+            return self.window_used <= self.rate_limit, headers
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(0, self.jitter_ms)
+            failed = self.random.random() < self.error_rate
+        if self.latency_ms or jitter:
+            time.sleep((self.latency_ms + jitter) / 1000)
+        return failed
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=b"", headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+            fake.record(status)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            match = LISTING_PATH.match(parsed.path)
+            if not match:
+                return self._send(404, b'{"error": 404}')
+
+            allowed, headers = fake.take_token()
+            if not allowed:
+                headers["Retry-After"] = headers["x-ratelimit-reset"]
+                return self._send(429, b'{"error": 429}', headers)
+
+            if fake.delay():
+                return self._send(503, b'{"error": 503}', headers)
+
+            query = parse_qs(parsed.query)
+            limit = min(int(query.get("limit", ["25"])[0]), 100)
+            after = query.get("after", [None])[0]
+            body, etag = fake.listing(match.group(1), match.group(2), limit, after)
+
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, headers=headers)
+            self._send(200, body, headers)
+
+    return Handler
+
+
+def start_server(fake, host="127.0.0.1", port=0):
+    """Serve `fake` on a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per window (0 = unlimited)")
+    parser.add_argument("--rate-window", type=int, default=60)
+    parser.add_argument("--posts-per-hour", type=float, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def from_arguments(args):
+    return FakeReddit(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+        posts_per_hour=args.posts_per_hour,
+        seed=args.seed
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Reddit listing server")
+    parser.add_argument("--port", type=int, default=8080)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_server(from_arguments(args), port=args.port)
+    print(f"Fake Reddit serving at {base_url} (set REDDIT_BASE_URL to use it)")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test: fake Reddit -> collector -> local MongoDB
+
+Starts the fake listing server, points the collector at it and at a
+separate database (trendradar_loadtest by default), runs a number of
+collection cycles over thousands of synthetic subreddits and reports
+throughput, request efficiency and cycle time. The production database is
+refused, and the target database is only emptied first with --reset.
+
+    python loadtest/run_load_test.py --subreddits 2000 --cycles 3 --latency-ms 20 --reset
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+from dotenv import load_dotenv
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from loadtest.fake_reddit import add_arguments, from_arguments, start_server
+
+load_dotenv()
+# The database the collector and dashboard use outside the load test
+PRODUCTION_DB = os.getenv("TRENDRADAR_DB", "trendradar")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the TrendRadar collector")
+    parser.add_argument("--subreddits", type=int, default=1000)
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--pause", type=float, default=0, help="Seconds between cycles")
+    parser.add_argument("--db", default="trendradar_loadtest")
+    parser.add_argument("--pages", type=int, default=2, help="Pages followed per listing")
+    parser.add_argument("--reset", action="store_true", help="Delete all posts in --db before the first cycle")
+    parser.add_argument("--verbose", action="store_true", help="Show collector output")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.db in (PRODUCTION_DB, "trendradar"):
+        print(f"❌ Refusing to load-test the production database '{args.db}', pick another --db")
+        sys.exit(1)
+
+    fake = from_arguments(args)
+    server, base_url = start_server(fake)
+
+    # The collector and connector read their configuration at import time
+    os.environ["REDDIT_BASE_URL"] = base_url
+    os.environ["REDDIT_REQUEST_DELAY"] = "0"
+    os.environ["COLLECTOR_PAGES"] = str(args.pages)
+    os.environ["TRENDRADAR_DB"] = args.db
+    os.environ["SEARCH_INDEX_PATH"] = os.path.join(tempfile.mkdtemp(), "search_index.pkl")
+
+    from collector import reddit_collector
+    from database.mongo_connector import db
+
+    if not db:
+        print("❌ MongoDB is required for the load test")
+        sys.exit(1)
+    if args.reset:
+        db.collection.delete_many({})
+
+    subreddits = [f"loadtest{i:05d}" for i in range(args.subreddits)]
+    print(f"Fake Reddit at {base_url}, {len(subreddits)} subreddits, {args.pages} pages per listing, "
+          f"database '{args.db}'")
+    print(f"{'cycle':>5} {'time (s)':>9} {'requests':>9} {'200':>6} {'304':>6} {'429':>6} {'5xx':>6} "
+          f"{'saved':>7} {'new':>7} {'posts/s':>8} {'new/req':>8}")
+
+    totals = {"time": 0, "requests": 0, "new": 0}
+    devnull = open(os.devnull, "w")
+    for cycle in range(1, args.cycles + 1):
+        before_stats = fake.snapshot()
+        before_count = db.collection.count_documents({})
+
+        started = time.perf_counter()
+        output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+        with output:
+            saved = reddit_collector.job(subreddits)
+        elapsed = time.perf_counter() - started
+
+        stats = fake.snapshot()
+        delta = {status: stats.get(status, 0) - before_stats.get(status, 0) for status in stats}
+        requests_made = sum(delta.values())
+        errors = sum(count for status, count in delta.items() if status >= 500)
+        new_posts = db.collection.count_documents({}) - before_count
+
+        totals["time"] += elapsed
+        totals["requests"] += requests_made
+        totals["new"] += new_posts
+
+        print(f"{cycle:>5} {elapsed:>9.2f} {requests_made:>9} {delta.get(200, 0):>6} {delta.get(304, 0):>6} "
+              f"{delta.get(429, 0):>6} {errors:>6} {saved:>7} {new_posts:>7} "
+              f"{saved / elapsed:>8.1f} {new_posts / max(requests_made, 1):>8.2f}")
+
+        if args.pause and cycle < args.cycles:
+            time.sleep(args.pause)
+
+    print(f"\n✅ {args.cycles} cycles, avg cycle {totals['time'] / args.cycles:.2f}s, "
+          f"{totals['new']} new posts from {totals['requests']} requests "
+          f"({totals['new'] / max(totals['requests'], 1):.2f} new posts/request)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Stability tests for the emergent topic clustering model
+
+Posts are synthetic: Zipfian noise words plus a few words of one theme,
+which is roughly what real unlabeled posts look like to the model.
+
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+import numpy as np
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.clustering import ClusterModel
+
+NOISE = [f"noise{i}" for i in range(5000)]
+NOISE_CDF = np.cumsum(1 / np.arange(1, len(NOISE) + 1))
+NOISE_CDF /= NOISE_CDF[-1]
+THEMES = [[f"theme{t}word{j}" for j in range(8)] for t in range(8)]
+
+
+def make_batch(rng, themes, size=300):
+    docs = []
+    for _ in range(size):
+        theme = THEMES[rng.choice(themes)]
+        noise = np.searchsorted(NOISE_CDF, rng.random(rng.integers(10, 40)))
+        docs.append([NOISE[i] for i in noise] + list(rng.choice(theme, size=3)))
+    return docs
+
+
+class ClusterStabilityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+        self.model = ClusterModel(k=12)
+        for _ in range(10):
+            self.model.fit_batch(make_batch(self.rng, range(6)))
+
+    def test_counts_stay_stable_across_batches(self):
+        ids = list(self.model.cluster_ids)
+        for _ in range(20):
+            before = self.model.center_counts.copy()
+            self.model.fit_batch(make_batch(self.rng, range(6)))
+            self.assertEqual(self.model.retired, [])
+            self.assertEqual(self.model.cluster_ids, ids)
+            self.assertTrue((self.model.center_counts >= before).all())
+
+    def test_new_theme_gets_a_new_cluster_id(self):
+        old_ids = set(self.model.cluster_ids)
+        retired = []
+        for _ in range(10):
+            docs = make_batch(self.rng, [0, 1, 2, 3, 4, 5, 6, 6])
+            assignments = self.model.fit_batch(docs)
+            retired.extend(self.model.retired)
+
+        self.assertEqual(len(retired), 1)
+        self.assertIn(retired[0], old_ids)
+        new_ids = set(self.model.cluster_ids) - old_ids
+        self.assertEqual(len(new_ids), 1)
+        new_id = new_ids.pop()
+        self.assertGreaterEqual(new_id, self.model.k)
+
+        # Posts of the new theme land in the new cluster
+        new_theme = [a for doc, a in zip(docs, assignments) if set(doc) & set(THEMES[6])]
+        self.assertGreater(new_theme.count(new_id), 0.8 * len(new_theme))
+
+
+if __name__ == "__main__":
+    unittest.main()